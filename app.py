@@ -153,8 +153,7 @@ def autoload_watcher():
                     filepath = os.path.join(AUTOLOAD_DIR, filename)
                     print(f"Processing autoload file: {filename}")
                     try:
-                        with open(filepath, 'r') as f:
-                            data = json.load(f)
+                        data = scubascore.load_json(filepath)
                         
                         results = process_scuba_data(data)
                         save_score_to_db(results)
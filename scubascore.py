@@ -37,10 +37,28 @@ Notes:
 - Verdicts supported (case-insensitive): PASS, FAIL, N/A (/ NOT APPLICABLE), UNKNOWN/ERROR.
 - Unknown entries are skipped but surfaced in "data_quality".
 """
-import argparse, json, pathlib, sys, csv, datetime, re
+import argparse, json, os, sys, csv, datetime, re, functools
 from collections import defaultdict
 
+try:
+    import orjson  # optional: faster parser for large ScubaGoggles reports
+except ImportError:
+    orjson = None
+
 def load_json(path):
+    if orjson is not None:
+        with open(path, "rb") as f:
+            raw = f.read()
+        if raw.startswith(b"\xef\xbb\xbf"):  # orjson rejects a UTF-8 BOM; utf-8-sig strips it
+            raw = raw[3:]
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            # orjson rejects some input the stdlib accepts (NaN/Infinity, lone surrogates,
+            # overflowing floats); never reject a file the stdlib parser would accept.
+            # Note: integers wider than 64 bits do not fail here; orjson silently returns
+            # them as floats, so with orjson installed such values lose precision.
+            return json.loads(raw)
     with open(path, "r", encoding="utf-8-sig") as f:
         return json.load(f)
 
@@ -48,40 +66,53 @@ def load_yaml(path, default=None):
     if not path:
         return default or {}
     import yaml  # stdlib in this environment may not include pyyaml in some contexts; fallback to simple parser if needed.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml-backed when PyYAML was built with it
     with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+        return yaml.load(f, Loader=loader) or {}
 
 def normalize_verdict(v):
     if v is None:
         return "UNKNOWN"
-    v = str(v).strip().upper()
-    # Handle common variants
-    if v in {"PASS", "PASSED", "TRUE"}:
-        return "PASS"
-    if v in {"FAIL", "FAILED", "FALSE"}:
-        return "FAIL"
-    if v in {"N/A", "NA", "NOT APPLICABLE"}:
-        return "NA"
-    if v in {"UNKNOWN", "ERROR"}:
-        return "UNKNOWN"
-    return v
-
+    # Verdicts come from a tiny vocabulary, so normalize each distinct string once.
+    # Keying on str(v) keeps e.g. True ("TRUE") and 1 ("1") from sharing a cache slot.
+    return _normalize_verdict_str(v if isinstance(v, str) else str(v))
+
+# Common verdict variants (upper-cased) -> canonical verdict
+_VERDICT_MAP = {
+    "PASS": "PASS", "PASSED": "PASS", "TRUE": "PASS",
+    "FAIL": "FAIL", "FAILED": "FAIL", "FALSE": "FAIL",
+    "N/A": "NA", "NA": "NA", "NOT APPLICABLE": "NA",
+    "UNKNOWN": "UNKNOWN", "ERROR": "UNKNOWN",
+}
+
+@functools.lru_cache(maxsize=64)
+def _normalize_verdict_str(v):
+    v = v.strip().upper()
+    return _VERDICT_MAP.get(v, v)
+
+# Common SCuBA prefixes like gws.gmail.*, gws.drive.*, gws.common.*
+_SERVICE_RE = re.compile(r"^[a-zA-Z0-9]+\.([a-z_]+)\.?")
+# Map common names to canonical service keys
+_SERVICE_ALIASES = {
+    "gmail": "gmail", "drive": "drive", "chat": "chat", "meet": "meet",
+    "calendar": "calendar", "groups": "groups", "classroom": "classroom",
+    "sites": "sites", "common": "common"
+}
+
+@functools.lru_cache(maxsize=4096)
 def infer_service(rule_id):
     if not rule_id:
         return None
-    # Common SCuBA prefixes like gws.gmail.*, gws.drive.*, gws.common.*
-    m = re.match(r"^[a-zA-Z0-9]+\.([a-z_]+)\.?", rule_id)
+    m = _SERVICE_RE.match(rule_id)
     if m:
         candidate = m.group(1)
-        # Map common names to canonical service keys
-        mapping = {
-            "gmail": "gmail", "drive": "drive", "chat": "chat", "meet": "meet",
-            "calendar": "calendar", "groups": "groups", "classroom": "classroom",
-            "sites": "sites", "common": "common"
-        }
-        return mapping.get(candidate, candidate)
+        return _SERVICE_ALIASES.get(candidate, candidate)
     return None
 
+# Top-level keys that may hold a flat list of rule entries, in lookup priority order.
+_RULE_LIST_KEYS = ("results", "rules", "checks", "findings", "items")
+_RULE_LIST_KEYS_SET = frozenset(_RULE_LIST_KEYS)
+
 def iter_rules(scuba_json):
     """
     Try to yield a normalized stream of rule dicts:
@@ -104,10 +135,11 @@ def iter_rules(scuba_json):
                                 yield normalize_rule(ctrl, default_service=svc)
             return
 
-        for k in ["results", "rules", "checks", "findings", "items"]:
-            if isinstance(scuba_json.get(k), list):
-                candidates = scuba_json[k]
-                break
+        if not scuba_json.keys().isdisjoint(_RULE_LIST_KEYS_SET):
+            for k in _RULE_LIST_KEYS:
+                if isinstance(scuba_json.get(k), list):
+                    candidates = scuba_json[k]
+                    break
         if not candidates:
             # Some formats: {"services": {"gmail": {"rules":[...]}, ...}}
             services_obj = scuba_json.get("services")
@@ -145,6 +177,30 @@ def normalize_rule(r, default_service=None):
         "severity": severity
     }
 
+def compensating_rule_ids(compensating):
+    """
+    Collapse a compensating config into a frozenset of rule IDs.
+
+    Accepts {"compensating": {...}}, a bare mapping, a list of rule IDs, or a
+    single rule ID. An empty section (all entries commented out) yields an
+    empty set.
+    """
+    comp = compensating or {}
+    if isinstance(comp, dict):
+        comp = comp.get("compensating", comp)  # allow bare mapping
+    if not comp:
+        return frozenset()
+    if isinstance(comp, str):
+        return frozenset((comp,))
+    if isinstance(comp, dict):
+        return frozenset(comp)
+    if isinstance(comp, (list, tuple)):
+        for item in comp:
+            if not isinstance(item, str):
+                raise ValueError(f"compensating list entries must be rule IDs, got {item!r}")
+        return frozenset(comp)
+    raise ValueError(f"Unsupported compensating config: {comp!r}")
+
 def compute_scores(scuba_json, weights_map, service_weights, compensating):
     """
     Compute weighted SCuBA security compliance scores from ScubaGoggles JSON results.
@@ -207,10 +263,10 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
         or bare dict: {"gmail": 0.20, ...}
         Values typically sum to 1.0 but will be normalized automatically.
 
-    compensating : dict or None
+    compensating : dict, list or None
         Mapping of rule IDs that have compensating controls.
         Format: {"compensating": {"rule_id1": true, "rule_id2": true, ...}}
-        or bare dict: {"rule_id1": true, ...}
+        or bare dict: {"rule_id1": true, ...}, a list of rule IDs, or a single rule ID.
         Rules in this list get 50% credit when they fail.
 
     Returns:
@@ -255,8 +311,7 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
     """
     # Prepare weight lookups
     default_weight = 1.0
-    comp = compensating or {}
-    comp_map = comp.get("compensating", comp)  # allow bare mapping
+    comp_map = compensating_rule_ids(compensating)
 
     per_service = defaultdict(lambda: {"W_pass": 0.0, "W_eval": 0.0, "passed": [], "failed": []})
     unknown_or_na = 0
@@ -264,6 +319,9 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
 
     # Normalize weights_map
     weight_map = (weights_map or {}).get("weights", weights_map) or {}
+    # Distinct prefix lengths, longest first: probing rule_id[:n] against the map costs one
+    # dict lookup per length (trie-like), however many prefixes the config defines.
+    prefix_lengths = tuple(sorted({len(k) for k in weight_map}, reverse=True))
 
     for entry in iter_rules(scuba_json):
         total_rules += 1
@@ -277,19 +335,23 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
         if W is None and rule_id:
             # Step 2: Try prefix-based mapping (e.g., 'gws.common.' matches 'gws.common.rule1')
             # If multiple prefixes match, use the longest one (most specific)
-            best_prefix = ""
-            for k in weight_map.keys():
-                if rule_id.startswith(k) and len(k) > len(best_prefix):
-                    best_prefix = k
-            W = weight_map.get(best_prefix, default_weight)
+            W = default_weight
+            for n in prefix_lengths:
+                if n <= len(rule_id):
+                    prefix = rule_id[:n]
+                    if prefix in weight_map:
+                        W = weight_map[prefix]
+                        break
         if W is None:
             # Step 3: Fallback to default weight (lowest precedence)
             W = default_weight
 
         if verdict == "PASS":
-            per_service[service]["W_pass"] += W
-            per_service[service]["W_eval"] += W
-            per_service[service]["passed"].append((rule_id, W))
+            agg = per_service[service]
+            if W:  # zero-weight (informational) rules are counted but add nothing to the sums
+                agg["W_pass"] += W
+                agg["W_eval"] += W
+            agg["passed"].append((rule_id, W))
         elif verdict == "FAIL":
             # Failed rules normally contribute 0% to passed_weight (full penalty).
             # However, if the rule_id is listed in compensating.yaml, it receives
@@ -297,10 +359,12 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
             # (e.g., third-party DLP, network controls, manual processes).
             # Both compensating and non-compensating failures add full weight to evaluated_weight.
             adjusted = 0.5 if rule_id in comp_map else 0.0  # 50% credit if compensating, 0% otherwise
-            per_service[service]["W_pass"] += W * adjusted
-            per_service[service]["W_eval"] += W
-            per_service[service]["failed"].append((rule_id, W, adjusted > 0))
-        elif verdict in {"NA"}:
+            agg = per_service[service]
+            if W:
+                agg["W_pass"] += W * adjusted
+                agg["W_eval"] += W
+            agg["failed"].append((rule_id, W, adjusted > 0))
+        elif verdict == "NA":
             # not counted
             pass
         else:
@@ -359,9 +423,12 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
     total_weight = 0.0      # Σ(service_weights) - denominator
     weighted_sum = 0.0      # Σ(service_weight × service_score) - numerator
     for svc, w in sw.items():
-        if svc in per_service_scores and per_service_scores[svc]["score"] is not None:
-            total_weight += float(w)                                      # accumulate weights
-            weighted_sum += float(w) * per_service_scores[svc]["score"]   # accumulate weighted scores
+        svc_result = per_service_scores.get(svc)
+        score = svc_result["score"] if svc_result is not None else None
+        if score is not None:
+            w = float(w)
+            total_weight += w               # accumulate weights
+            weighted_sum += w * score       # accumulate weighted scores
     overall = (weighted_sum / total_weight) if total_weight > 0 else None  # compute weighted mean
 
     results = {
@@ -375,6 +442,17 @@ def compute_scores(scuba_json, weights_map, service_weights, compensating):
     }
     return results
 
+def write_json(prefix, results, compact=False):
+    path = f"{prefix}_scores.json"
+    # Serialize in one go and hand the encoded bytes to a single write() instead of
+    # letting json.dump stream many small indent fragments to the file handle.
+    indent = None if compact else 2
+    separators = (",", ":") if compact else None
+    payload = json.dumps(results, indent=indent, separators=separators)
+    with open(path, "wb") as f:
+        f.write(payload.encode("ascii"))
+    return path
+
 def write_csv(prefix, per_service_scores):
     path = f"{prefix}_scores.csv"
     with open(path, "w", newline="", encoding="utf-8") as f:
@@ -438,6 +516,7 @@ def main():
     p.add_argument("--service-weights", required=False, help="service_weights.yaml with service_weights mapping")
     p.add_argument("--compensating", required=False, help="compensating.yaml (optional)")
     p.add_argument("--out-prefix", required=True, help="Output file prefix (directories must exist)")
+    p.add_argument("--compact-json", action="store_true", help="Write <prefix>_scores.json without indentation")
     args = p.parse_args()
 
     data = load_json(args.input)
@@ -454,10 +533,10 @@ def main():
 
     # Write outputs
     prefix = args.out_prefix
-    pathlib.Path(prefix).parent.mkdir(parents=True, exist_ok=True)
-    json_path = f"{prefix}_scores.json"
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2)
+    out_dir = os.path.dirname(prefix)
+    if out_dir and not os.path.isdir(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+    json_path = write_json(prefix, results, compact=args.compact_json)
     csv_path = write_csv(prefix, results["per_service"])
     html_path = write_html(prefix, results)
 
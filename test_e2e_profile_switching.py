@@ -4,12 +4,21 @@ End-to-end test for profile switching functionality.
 Tests the complete workflow of switching between GWS and M365 profiles.
 """
 
+import os
 import requests
 import json
 import yaml
 import time
 from bs4 import BeautifulSoup
 
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml-backed when PyYAML was built with it
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
 BASE_URL = "http://localhost:5000"
 session = requests.Session()
 
@@ -18,27 +27,44 @@ def print_step(step_num, description):
     print(f"Step {step_num}: {description}")
     print('='*60)
 
+def file_mtime_ns(path):
+    """Return the file's mtime in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def wait_for_file_change(path, baseline_mtime, timeout=2.0, interval=0.02):
+    """Poll the file's mtime until it differs from baseline_mtime; False on timeout."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if file_mtime_ns(path) != baseline_mtime:
+            return True
+        time.sleep(interval)
+    return False
+
 def verify_profile_in_config(expected_profile):
     """Verify profile_config.yaml has the expected profile."""
     with open("profile_config.yaml", "r") as f:
-        config = yaml.safe_load(f)
+        config = yaml.load(f, Loader=YamlLoader)
     actual = config.get("current_profile")
     assert actual == expected_profile, f"Expected profile '{expected_profile}', got '{actual}'"
     print(f"✓ profile_config.yaml shows: {actual}")
 
-def verify_profile_in_page(html, expected_profile):
+def parse_page(html):
+    """Parse a page once so the verify_* helpers can share the soup."""
+    return BeautifulSoup(html, HTML_PARSER)
+
+def verify_profile_in_page(soup, expected_profile):
     """Verify the settings page shows the expected profile as selected."""
-    soup = BeautifulSoup(html, 'html.parser')
     select = soup.find('select', {'name': 'profile'})
     selected = select.find('option', {'selected': True})
     actual = selected['value']
     assert actual == expected_profile, f"Expected selected profile '{expected_profile}', got '{actual}'"
     print(f"✓ Page shows selected profile: {actual}")
-    return soup
 
-def verify_service_weights_content(html, expected_services):
+def verify_service_weights_content(soup, expected_services):
     """Verify the service weights textarea contains the expected services."""
-    soup = BeautifulSoup(html, 'html.parser')
     textarea = soup.find('textarea', {'name': 'service_weights_yaml'})
     content = textarea.text
     for service in expected_services:
@@ -90,7 +116,7 @@ def test_scoring_with_profile(profile, expected_services):
         filename = f"service_weights_{profile}.yaml"
 
     with open(filename, "r") as f:
-        weights = yaml.safe_load(f)
+        weights = yaml.load(f, Loader=YamlLoader)
 
     # Verify the file has the expected services
     service_weights = weights.get('service_weights', {})
@@ -120,9 +146,10 @@ def main():
         # Step 3: Verify GWS (default) is default profile
         print_step(3, "Verify default profile is GWS")
         verify_profile_in_config("default")
-        verify_profile_in_page(response.text, "default")
+        soup = parse_page(response.text)
+        verify_profile_in_page(soup, "default")
         gws_services = ["gmail", "drive", "common"]
-        verify_service_weights_content(response.text, gws_services)
+        verify_service_weights_content(soup, gws_services)
 
         # Step 4: Test API endpoint for M365 profile
         print_step(4, "Test API endpoint for M365 profile")
@@ -133,20 +160,22 @@ def main():
         print_step(5, "Switch to M365 profile and verify content")
         # Get current weights content
         response = session.get(f"{BASE_URL}/settings")
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_page(response.text)
         weights_textarea = soup.find('textarea', {'name': 'weights_yaml'})
         weights_content = weights_textarea.text
 
         # Save with M365 profile
+        baseline_mtime = file_mtime_ns("profile_config.yaml")
         save_settings("m365", weights_content, m365_content)
 
         # Step 6: Reload page and verify M365 is selected
         print_step(6, "Reload page and verify M365 is still selected")
-        time.sleep(0.5)  # Brief pause for file write
+        wait_for_file_change("profile_config.yaml", baseline_mtime)
         response = session.get(f"{BASE_URL}/settings")
         verify_profile_in_config("m365")
-        verify_profile_in_page(response.text, "m365")
-        verify_service_weights_content(response.text, m365_services)
+        soup = parse_page(response.text)
+        verify_profile_in_page(soup, "m365")
+        verify_service_weights_content(soup, m365_services)
 
         # Step 7: Verify scoring uses M365 weights
         print_step(7, "Verify scoring uses M365 weights")
@@ -157,19 +186,21 @@ def main():
         gws_content = test_api_endpoint("default", gws_services)
 
         response = session.get(f"{BASE_URL}/settings")
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_page(response.text)
         weights_textarea = soup.find('textarea', {'name': 'weights_yaml'})
         weights_content = weights_textarea.text
 
+        baseline_mtime = file_mtime_ns("profile_config.yaml")
         save_settings("default", weights_content, gws_content)
 
         # Step 9: Verify GWS content and persistence
         print_step(9, "Verify GWS content and persistence")
-        time.sleep(0.5)  # Brief pause for file write
+        wait_for_file_change("profile_config.yaml", baseline_mtime)
         response = session.get(f"{BASE_URL}/settings")
         verify_profile_in_config("default")
-        verify_profile_in_page(response.text, "default")
-        verify_service_weights_content(response.text, gws_services)
+        soup = parse_page(response.text)
+        verify_profile_in_page(soup, "default")
+        verify_service_weights_content(soup, gws_services)
 
         # Step 10: Verify scoring uses GWS weights
         print_step(10, "Verify scoring uses GWS weights")